@@ -5,21 +5,154 @@ A coding assistant CLI tool with specialized prompts and comprehensive benchmark
 """
 
 import argparse
+import asyncio
+import atexit
+import glob
+import hashlib
+import mmap
+import operator
+import os
+import stat
 import sys
 import time
-import json
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable, Tuple
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+import aiohttp
+import orjson
+from datetime import datetime, timedelta
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+BENCHMARK_FIELDS = (
+    'timestamp', 'model', 'task_type', 'response_time',
+    'file_size', 'prompt_length', 'response_length',
+    'success', 'error_message', 'time_to_first_token', 'cache_hit'
+)
+
+DEFAULT_BENCHMARK_DIR = "/workspace/benchmarks"
+DEFAULT_CACHE_DIR = f"{DEFAULT_BENCHMARK_DIR}/cache"
+
+MODELS_CACHE_TTL = 30
+
+CSV_BUFFER_SIZE = 1 << 16
+# Read size for streamed responses; Ollama's final line carries the whole context array
+STREAM_CHUNK_SIZE = 1 << 16
+BENCHMARK_FLUSH_ROWS = 64
+
+# Prompt templates per task type, stored as (prefix, middle, suffix) fragments
+# around the code context and the question so only the selected one is built
+TASK_TEMPLATES = {
+    "review": ("""You are an expert code reviewer. Analyze the following code for:
+- Code quality and best practices
+- Potential bugs or issues
+- Security vulnerabilities
+- Performance improvements
+- Documentation and comments
+
+Provide specific, actionable feedback with examples where appropriate.
+
+Code to review:
+```python
+""", """
+```
+
+Question: """, ""),
+
+    "debug": ("""You are an expert debugger. The user needs help debugging this code. Analyze for:
+- Logic errors and incorrect assumptions
+- Runtime issues and exceptions
+- Edge cases not handled
+- Missing error handling
+- Potential infinite loops or recursion
+
+Provide step-by-step debugging guidance with explanations.
+
+Code to debug:
+```python
+""", """
+```
+
+Question: """, ""),
+
+    "explain": ("""You are a helpful programming teacher. Explain this code clearly and simply:
+- What the code does
+- How it works
+- Key concepts and patterns used
+- What each major section does
+
+Use analogies or simple language when helpful.
+
+Code to explain:
+```python
+""", """
+```
+
+Question: """, ""),
+
+    "optimize": ("""You are a performance optimization expert. Analyze this code for:
+- Algorithmic improvements
+- Memory usage optimization
+- Bottleneck identification
+- Parallelization opportunities
+- Python-specific optimizations
+
+Provide concrete optimization suggestions with code examples.
+
+Code to optimize:
+```python
+""", """
+```
+
+Question: """, ""),
+
+    "general": ("""You are a helpful coding assistant. Analyze the following code:
+
+```python
+""", """
+```
+
+Question: """, """
+
+Please provide a helpful response focusing on code analysis and improvement suggestions."""),
+}
+
+# Supported task types, in display order
+TASK_TYPES = tuple(TASK_TEMPLATES)
+
+
+def utf8_len(text: str) -> int:
+    """Return the UTF-8 byte length of text without encoding ASCII-only strings"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-8'))
+
+
+def load_file_text(file_path: str) -> str:
+    """Read a UTF-8 file; raises OSError or UnicodeDecodeError on failure"""
+    with open(file_path, 'rb') as f:
+        file_stat = os.fstat(f.fileno())
+        # Only non-empty regular files can be mapped; pipes and procfs files report size 0
+        if stat.S_ISREG(file_stat.st_mode) and file_stat.st_size > 0:
+            # Decode straight from the mapped pages, skipping an intermediate bytes copy
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                content = str(mm, 'utf-8')
+        else:
+            content = f.read().decode('utf-8')
+    # Match text-mode universal newline handling
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
 
 
 def read_file_content(file_path: str) -> str:
-    """Read and return file content"""
+    """Read and return file content, exiting on error"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return load_file_text(file_path)
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found")
         sys.exit(1)
@@ -29,41 +162,132 @@ def read_file_content(file_path: str) -> str:
 
 
 class BenchmarkLogger:
-    """Handles benchmark data collection and logging"""
+    """Handles benchmark data collection and logging
 
-    def __init__(self, benchmark_dir: str = "/workspace/benchmarks"):
+    Rows go to a CSV file plus a JSON session log by default, or to a single
+    Parquet file when output_format is "parquet" (requires pyarrow). With
+    compress_log the JSON session log is written zstd-compressed (requires
+    zstandard); it has no effect on Parquet output, which has no JSON log.
+    """
+
+    def __init__(self, benchmark_dir: str = DEFAULT_BENCHMARK_DIR, output_format: str = "csv",
+                 compress_log: bool = False):
         self.benchmark_dir = Path(benchmark_dir)
         self.benchmark_dir.mkdir(exist_ok=True)
+        self.output_format = output_format
+        self._zstd = None
+        if compress_log and output_format != "parquet":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Compressed benchmark logs require zstandard (pip install zstandard)")
+            self._zstd = zstandard
+
+        # Wall-clock time is read once; rows record cheap monotonic offsets from it
+        self._t0_wall = datetime.now()
+        self._t0_mono = time.monotonic_ns()
+        self._t0_us = (self._t0_wall - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+        # CSV timestamps reuse the formatted date and time while the second is unchanged
+        self._csv_second = None
+        self._csv_second_prefix = ""
 
         # Create timestamp for this session
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_id = self._t0_wall.strftime("%Y%m%d_%H%M%S")
         self.log_file = self.benchmark_dir / f"benchmark_{self.session_id}.json"
+        if self._zstd:
+            self.log_file = self.log_file.with_suffix(".json.zst")
         self.csv_file = self.benchmark_dir / f"benchmark_{self.session_id}.csv"
+        self.parquet_file = self.benchmark_dir / f"benchmark_{self.session_id}.parquet"
 
         # Initialize log data
         self.log_data = {
             "session_id": self.session_id,
-            "start_time": datetime.now().isoformat(),
+            "start_time": self._t0_wall,
             "benchmarks": []
         }
 
-        # Initialize CSV writer
-        self.csv_file_handle = open(self.csv_file, 'w', newline='')
-        self.csv_writer = csv.writer(self.csv_file_handle)
-        self.csv_writer.writerow([
-            'timestamp', 'model', 'task_type', 'response_time',
-            'file_size', 'prompt_length', 'response_length',
-            'success', 'error_message'
+        if output_format == "parquet":
+            self._init_parquet()
+        else:
+            # Initialize CSV writer with a large buffer; rows are flushed in batches
+            self.csv_file_handle = open(self.csv_file, 'w', newline='', buffering=CSV_BUFFER_SIZE)
+            self.csv_writer = csv.writer(self.csv_file_handle)
+            self.csv_writer.writerow(BENCHMARK_FIELDS)
+            # Pulls the non-timestamp columns out of an entry in one C-level call
+            self._csv_row_getter = operator.itemgetter(*BENCHMARK_FIELDS[1:])
+        self._pending = 0
+        self._closed = False
+
+        # Rows are written on a single background thread so disk I/O stays off the request path
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="benchmark-writer")
+
+        # Make sure buffered rows reach disk even if the run is interrupted
+        atexit.register(self.close)
+
+    def _init_parquet(self):
+        """Open a Parquet writer with an explicit schema"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet benchmark output requires pyarrow (pip install pyarrow)")
+
+        self._pa = pa
+        self.parquet_schema = pa.schema([
+            ('timestamp', pa.timestamp('us')),
+            ('model', pa.string()),
+            ('task_type', pa.string()),
+            ('response_time', pa.float64()),
+            ('file_size', pa.int64()),
+            ('prompt_length', pa.int64()),
+            ('response_length', pa.int64()),
+            ('success', pa.bool_()),
+            ('error_message', pa.string()),
+            ('time_to_first_token', pa.float64()),
+            ('cache_hit', pa.bool_()),
         ])
+        self.parquet_writer = pq.ParquetWriter(self.parquet_file, self.parquet_schema)
+        self._parquet_batch = {field: [] for field in BENCHMARK_FIELDS}
+
+    def _wall_time(self, elapsed_ns: int) -> datetime:
+        """Convert a monotonic offset from session start into a wall-clock datetime"""
+        return self._t0_wall + timedelta(microseconds=elapsed_ns // 1000)
+
+    def _csv_timestamp(self, elapsed_ns: int) -> str:
+        """Format a monotonic offset like _wall_time(offset).isoformat() without building a datetime per row"""
+        second, micros = divmod(self._t0_us + elapsed_ns // 1000, 1_000_000)
+        if second != self._csv_second:
+            self._csv_second = second
+            self._csv_second_prefix = (datetime(1970, 1, 1) + timedelta(seconds=second)).isoformat()
+        # isoformat (and orjson in the JSON log) drop the fraction on a whole second
+        if micros:
+            return f"{self._csv_second_prefix}.{micros:06d}"
+        return self._csv_second_prefix
+
+    def _write_parquet_batch(self):
+        """Write buffered rows as one Parquet row group"""
+        if self._pending == 0:
+            return
+        # Timestamps are buffered as monotonic offsets; convert the batch to epoch microseconds
+        # The batch stays untouched until the write succeeds, so a failed write can be retried
+        t0_us = self._t0_us
+        columns = dict(self._parquet_batch)
+        columns['timestamp'] = [t0_us + ns // 1000 for ns in self._parquet_batch['timestamp']]
+        table = self._pa.table(columns, schema=self.parquet_schema)
+        self.parquet_writer.write_table(table)
+        self._parquet_batch = {field: [] for field in BENCHMARK_FIELDS}
+        self._pending = 0
 
     def log_benchmark(self, model: str, task_type: str, response_time: float,
                      file_size: int, prompt_length: int, response_length: int,
-                     success: bool, error_message: str = ""):
+                     success: bool, error_message: str = "",
+                     time_to_first_token: Optional[float] = None, cache_hit: bool = False):
         """Log a benchmark result"""
 
-        # Log to JSON
+        # Timestamp is nanoseconds since session start; materialized when written out
         benchmark_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.monotonic_ns() - self._t0_mono,
             "model": model,
             "task_type": task_type,
             "response_time": response_time,
@@ -71,27 +295,77 @@ class BenchmarkLogger:
             "prompt_length": prompt_length,
             "response_length": response_length,
             "success": success,
-            "error_message": error_message
+            "error_message": error_message,
+            "time_to_first_token": time_to_first_token,
+            "cache_hit": cache_hit
         }
 
+        self._pool.submit(self._write_row, benchmark_entry)
+
+    def _write_row(self, benchmark_entry: Dict[str, Any]):
+        """Write one benchmark entry; runs on the writer thread"""
+        try:
+            self._append_row(benchmark_entry)
+        except Exception as e:
+            print(f"Warning: Could not write benchmark row: {e}")
+
+    def _append_row(self, benchmark_entry: Dict[str, Any]):
+        """Append an entry to the Parquet batch or the JSON/CSV logs"""
+        self._pending += 1
+
+        if self.output_format == "parquet":
+            for field in BENCHMARK_FIELDS:
+                self._parquet_batch[field].append(benchmark_entry[field])
+
+            if self._pending >= BENCHMARK_FLUSH_ROWS:
+                self._write_parquet_batch()
+            return
+
+        # Log to JSON
         self.log_data["benchmarks"].append(benchmark_entry)
 
         # Log to CSV
-        self.csv_writer.writerow([
-            benchmark_entry["timestamp"], model, task_type, response_time,
-            file_size, prompt_length, response_length, success, error_message
-        ])
+        self.csv_writer.writerow((
+            self._csv_timestamp(benchmark_entry["timestamp"]),
+            *self._csv_row_getter(benchmark_entry)
+        ))
 
-        # Flush to disk
-        self.csv_file_handle.flush()
+        # Flush to disk in batches rather than per row
+        if self._pending >= BENCHMARK_FLUSH_ROWS:
+            self.csv_file_handle.flush()
+            self._pending = 0
 
     def close(self):
         """Close the logger and save final data"""
-        try:
-            self.log_data["end_time"] = datetime.now().isoformat()
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
 
-            with open(self.log_file, 'w') as f:
-                json.dump(self.log_data, f, indent=2)
+        # Wait for queued rows before writing the final files
+        self._pool.shutdown(wait=True)
+
+        try:
+            if self.output_format == "parquet":
+                self._write_parquet_batch()
+                self.parquet_writer.close()
+
+                print(f"📊 Benchmark data saved to:")
+                print(f"   Parquet: {self.parquet_file}")
+                return
+
+            self.log_data["end_time"] = self._wall_time(time.monotonic_ns() - self._t0_mono)
+            for entry in self.log_data["benchmarks"]:
+                entry["timestamp"] = self._wall_time(entry["timestamp"])
+
+            if self._zstd:
+                # Compressed logs are for tools, not eyes, so skip the indentation
+                cctx = self._zstd.ZstdCompressor(level=3)
+                with open(self.log_file, 'wb') as raw, cctx.stream_writer(raw) as f:
+                    f.write(orjson.dumps(self.log_data))
+            else:
+                with open(self.log_file, 'wb') as f:
+                    f.write(orjson.dumps(self.log_data, option=orjson.OPT_INDENT_2))
 
             self.csv_file_handle.close()
 
@@ -102,105 +376,280 @@ class BenchmarkLogger:
             print(f"Warning: Could not save benchmark data: {e}")
 
 
+async def iter_ndjson_lines(content: aiohttp.StreamReader):
+    """Yield the lines of an aiohttp response body, however long they are
+
+    StreamReader's own line iteration rejects lines longer than its buffer,
+    and Ollama's final chunk carries the whole context token array.
+    """
+    pending = b""
+    async for data in content.iter_any():
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class StreamCollector:
+    """Accumulates a streamed Ollama response from its NDJSON lines"""
+
+    def __init__(self, on_token: Optional[Callable[[str], None]] = None):
+        self.on_token = on_token
+        self.start_time = time.time()
+        self.first_token_time = None
+        self.parts = []
+        self.error_message = ""
+        self.done = False
+
+    def feed(self, line: bytes) -> bool:
+        """Handle one line of the stream; returns True once the stream is finished"""
+        if not line.strip():
+            return False
+
+        chunk = orjson.loads(line)
+        if 'error' in chunk:
+            self.error_message = f"Ollama returned error: {chunk['error']}"
+            return True
+
+        token = chunk.get('response', '')
+        if token:
+            if self.first_token_time is None:
+                self.first_token_time = time.time() - self.start_time
+            self.parts.append(token)
+            if self.on_token:
+                self.on_token(token)
+
+        if chunk.get('done'):
+            self.done = True
+        return self.done
+
+
+class ResponseCache:
+    """Exact-match cache of model responses, keyed by server, model and full prompt
+
+    Entries live in memory and, when cache_dir is given, as one small JSON
+    file per entry so repeated runs can reuse them. Entries never expire;
+    delete cache_dir to clear them.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self._memory = {}
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(base_url: str, model: str, full_prompt: str) -> str:
+        """Hash the Ollama URL, model name and prompt into a cache key"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(base_url.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(model.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(full_prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss"""
+        if key in self._memory:
+            return self._memory[key]
+        if self.cache_dir is None:
+            return None
+        try:
+            response_text = orjson.loads((self.cache_dir / f"{key}.json").read_bytes())["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._memory[key] = response_text
+        return response_text
+
+    def put(self, key: str, response_text: str):
+        """Store a response"""
+        self._memory[key] = response_text
+        if self.cache_dir:
+            try:
+                (self.cache_dir / f"{key}.json").write_bytes(orjson.dumps({"response": response_text}))
+            except OSError as e:
+                print(f"Warning: Could not write response cache: {e}")
+
+
 class DeepseekCoderClient:
     """Enhanced client for Deepseek-Coder with specialized prompts"""
 
-    def __init__(self, base_url: str = "http://localhost:11434", benchmark_logger: BenchmarkLogger = None):
+    def __init__(self, base_url: str = "http://localhost:11434", benchmark_logger: BenchmarkLogger = None,
+                 response_cache: Optional[ResponseCache] = None):
         self.base_url = base_url
         self.benchmark_logger = benchmark_logger
+        self.response_cache = response_cache
+
+        # Reuse keep-alive connections across requests instead of reconnecting per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release pooled HTTP connections"""
+        self.session.close()
 
     def get_specialized_prompt(self, task_type: str, context: str, question: str) -> str:
         """Generate specialized prompts based on task type"""
 
-        task_prompts = {
-            "review": f"""You are an expert code reviewer. Analyze the following code for:
-- Code quality and best practices
-- Potential bugs or issues
-- Security vulnerabilities
-- Performance improvements
-- Documentation and comments
+        prefix, middle, suffix = TASK_TEMPLATES.get(task_type.lower(), TASK_TEMPLATES["general"])
+        return f"{prefix}{context}{middle}{question}{suffix}"
 
-Provide specific, actionable feedback with examples where appropriate.
+    def chat_with_benchmark(self, prompt: str, context: str, model: str = "deepseek-coder",
+                           task_type: str = "general", timeout: int = 120,
+                           on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Send a chat request to Ollama with performance tracking
 
-Code to review:
-```python
-{context}
-```
+        The response is streamed; on_token, if given, is called with each
+        token as it arrives.
+        """
 
-Question: {question}""",
+        full_prompt = self.get_specialized_prompt(task_type, context, prompt)
 
-            "debug": f"""You are an expert debugger. The user needs help debugging this code. Analyze for:
-- Logic errors and incorrect assumptions
-- Runtime issues and exceptions
-- Edge cases not handled
-- Missing error handling
-- Potential infinite loops or recursion
+        cache_key, cached = self._cached_response(model, full_prompt)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return self._finish_benchmark(model, task_type, context, full_prompt, cached,
+                                          0.0, 0.0, True, "", cache_hit=True)
 
-Provide step-by-step debugging guidance with explanations.
+        url = f"{self.base_url}/api/generate"
 
-Code to debug:
-```python
-{context}
-```
+        payload = {
+            "model": model,
+            "prompt": full_prompt,
+            "stream": True
+        }
 
-Question: {question}""",
+        stream = StreamCollector(on_token)
 
-            "explain": f"""You are a helpful programming teacher. Explain this code clearly and simply:
-- What the code does
-- How it works
-- Key concepts and patterns used
-- What each major section does
+        try:
+            # Increased timeout to 120s for first inference (model loading)
+            with self.session.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS,
+                                   timeout=timeout, stream=True) as response:
+                if response.status_code >= 400:
+                    stream.error_message = f"Ollama returned error: {response.status_code} - {response.text}"
+                else:
+                    # The default 512-byte chunks make reassembling the long final line quadratic;
+                    # chunked responses still yield each token as soon as it arrives
+                    for line in response.iter_lines(chunk_size=STREAM_CHUNK_SIZE):
+                        if stream.feed(line):
+                            break
 
-Use analogies or simple language when helpful.
+        except Exception as e:
+            stream.error_message = self._request_error_message(e, timeout)
 
-Code to explain:
-```python
-{context}
-```
+        return self._finish_stream(model, task_type, context, full_prompt, cache_key, stream)
 
-Question: {question}""",
+    async def _achat(self, session: aiohttp.ClientSession, prompt: str, context: str,
+                     model: str = "deepseek-coder", task_type: str = "general",
+                     timeout: int = 120, full_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of chat_with_benchmark sharing an aiohttp session
 
-            "optimize": f"""You are a performance optimization expert. Analyze this code for:
-- Algorithmic improvements
-- Memory usage optimization
-- Bottleneck identification
-- Parallelization opportunities
-- Python-specific optimizations
+        Pass full_prompt to reuse a prompt already built by get_specialized_prompt.
+        """
 
-Provide concrete optimization suggestions with code examples.
+        if full_prompt is None:
+            full_prompt = self.get_specialized_prompt(task_type, context, prompt)
 
-Code to optimize:
-```python
-{context}
-```
+        cache_key, cached = self._cached_response(model, full_prompt)
+        if cached is not None:
+            return self._finish_benchmark(model, task_type, context, full_prompt, cached,
+                                          0.0, 0.0, True, "", cache_hit=True)
 
-Question: {question}""",
+        url = f"{self.base_url}/api/generate"
 
-            "general": f"""You are a helpful coding assistant. Analyze the following code:
+        payload = {
+            "model": model,
+            "prompt": full_prompt,
+            "stream": True
+        }
 
-```python
-{context}
-```
+        stream = StreamCollector()
 
-Question: {question}
+        try:
+            async with session.post(url, data=orjson.dumps(payload),
+                                    headers=JSON_HEADERS) as response:
+                if response.status >= 400:
+                    body = await response.text()
+                    stream.error_message = f"Ollama returned error: {response.status} - {body}"
+                else:
+                    async for line in iter_ndjson_lines(response.content):
+                        if stream.feed(line):
+                            break
 
-Please provide a helpful response focusing on code analysis and improvement suggestions."""
-        }
+        except Exception as e:
+            stream.error_message = self._request_error_message(e, timeout)
+
+        return self._finish_stream(model, task_type, context, full_prompt, cache_key, stream)
+
+    @staticmethod
+    def async_session(timeout: int = 120) -> aiohttp.ClientSession:
+        """Open an aiohttp session for _achat whose timeout matches the requests path"""
+        # Per-read like requests, so a stream that keeps producing tokens is never cut off
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+        return aiohttp.ClientSession(timeout=client_timeout)
+
+    @staticmethod
+    def _request_error_message(error: Exception, timeout: int) -> str:
+        """Describe a failed request the same way for both HTTP transports"""
+        # Timeouts first: aiohttp's read timeout is also a ClientConnectionError, and
+        # requests wraps a read timeout while streaming in a ConnectionError
+        wrapped = error.args[0] if error.args else None
+        if (isinstance(error, (requests.exceptions.Timeout, asyncio.TimeoutError))
+                or isinstance(wrapped, ReadTimeoutError)):
+            return f"Request to Ollama timed out (exceeded {timeout}s). Try increasing timeout with --timeout flag"
+        if isinstance(error, (requests.exceptions.ConnectionError, aiohttp.ClientConnectionError)):
+            return "Cannot connect to Ollama. Make sure Ollama is running on http://localhost:11434"
+        return f"Error communicating with Ollama: {error}"
+
+    def _finish_stream(self, model: str, task_type: str, context: str, full_prompt: str,
+                       cache_key: Optional[str], stream: "StreamCollector") -> Dict[str, Any]:
+        """Turn a collected stream into a result, caching successful responses"""
+
+        response_time = time.time() - stream.start_time
+        if not stream.error_message and not stream.done:
+            # A stream cut off without its final chunk holds a partial answer
+            stream.error_message = "Ollama stream ended before completion"
+        success = not stream.error_message
+
+        if success:
+            response_text = ''.join(stream.parts) or 'No response from Ollama'
+            if cache_key and stream.parts:
+                self.response_cache.put(cache_key, response_text)
+        else:
+            response_text = f"Error: {stream.error_message}"
 
-        return task_prompts.get(task_type.lower(), task_prompts["general"])
+        return self._finish_benchmark(model, task_type, context, full_prompt, response_text,
+                                      response_time, stream.first_token_time, success,
+                                      stream.error_message)
 
-    def chat_with_benchmark(self, prompt: str, context: str, model: str = "deepseek-coder",
-                           task_type: str = "general", timeout: int = 120) -> Dict[str, Any]:
-        """Send a chat request to Ollama with performance tracking"""
+    async def _awarmup(self, session: aiohttp.ClientSession, model: str,
+                       timeout: int = 120) -> Dict[str, Any]:
+        """Load a model with a one-token request so its cold start stays out of benchmarks
 
-        full_prompt = self.get_specialized_prompt(task_type, context, prompt)
+        Logged with task type "_warmup" so analyses can filter it out.
+        """
 
         url = f"{self.base_url}/api/generate"
 
+        full_prompt = " "
+
         payload = {
             "model": model,
             "prompt": full_prompt,
-            "stream": False
+            "stream": False,
+            "options": {"num_predict": 1}
         }
 
         start_time = time.time()
@@ -209,47 +658,58 @@ Please provide a helpful response focusing on code analysis and improvement sugg
         error_message = ""
 
         try:
-            # Increased timeout to 120s for first inference (model loading)
-            response = requests.post(url, json=payload, timeout=timeout)
-            response.raise_for_status()
-            result = response.json()
-            response_text = result.get('response', 'No response from Ollama')
-            success = True
-
-        except requests.exceptions.ConnectionError:
-            error_message = "Cannot connect to Ollama. Make sure Ollama is running on http://localhost:11434"
-            response_text = f"Error: {error_message}"
-        except requests.exceptions.Timeout:
-            error_message = f"Request to Ollama timed out (exceeded {timeout}s). Try increasing timeout with --timeout flag"
-            response_text = f"Error: {error_message}"
-        except requests.exceptions.HTTPError as e:
-            error_message = f"Ollama returned error: {response.status_code} - {response.text}"
-            response_text = f"Error: {error_message}"
+            async with session.post(url, data=orjson.dumps(payload),
+                                    headers=JSON_HEADERS) as response:
+                body = await response.read()
+                if response.status >= 400:
+                    error_message = f"Ollama returned error: {response.status} - {body.decode('utf-8', 'replace')}"
+                else:
+                    response_text = orjson.loads(body).get('response', '')
+                    success = True
         except Exception as e:
-            error_message = f"Error communicating with Ollama: {e}"
+            # The real request reports the problem too; a failed warm-up is only logged
+            error_message = self._request_error_message(e, timeout)
+
+        if error_message:
             response_text = f"Error: {error_message}"
 
-        end_time = time.time()
-        response_time = end_time - start_time
+        return self._finish_benchmark(model, "_warmup", "", full_prompt, response_text,
+                                      time.time() - start_time, None, success, error_message)
+
+    def _cached_response(self, model: str, full_prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached response); both are None when caching is off"""
+        if not self.response_cache:
+            return None, None
+        cache_key = self.response_cache.make_key(self.base_url, model, full_prompt)
+        return cache_key, self.response_cache.get(cache_key)
+
+    def _finish_benchmark(self, model: str, task_type: str, context: str, full_prompt: str,
+                          response_text: str, response_time: float,
+                          time_to_first_token: Optional[float], success: bool,
+                          error_message: str, cache_hit: bool = False) -> Dict[str, Any]:
+        """Log benchmark data and build the result dict"""
 
-        # Log benchmark data
         if self.benchmark_logger:
             self.benchmark_logger.log_benchmark(
                 model=model,
                 task_type=task_type,
                 response_time=response_time,
-                file_size=len(context.encode('utf-8')),
-                prompt_length=len(full_prompt.encode('utf-8')),
-                response_length=len(response_text.encode('utf-8')),
+                time_to_first_token=time_to_first_token,
+                file_size=utf8_len(context),
+                prompt_length=utf8_len(full_prompt),
+                response_length=utf8_len(response_text),
                 success=success,
-                error_message=error_message
+                error_message=error_message,
+                cache_hit=cache_hit
             )
 
         return {
             "response": response_text,
             "response_time": response_time,
+            "time_to_first_token": time_to_first_token,
             "success": success,
-            "error": error_message
+            "error": error_message,
+            "cache_hit": cache_hit
         }
 
     def chat(self, prompt: str, context: str, model: str = "deepseek-coder",
@@ -259,50 +719,233 @@ Please provide a helpful response focusing on code analysis and improvement sugg
         return result["response"]
 
 
-class ModelComparator:
-    """Compare performance across multiple models"""
+class ClientRunner:
+    """Base for helpers that drive a DeepseekCoderClient
 
-    def __init__(self, base_url: str = "http://localhost:11434", benchmark_logger: BenchmarkLogger = None):
+    Reuses the caller's client when given; otherwise creates one and
+    closes it in close().
+    """
+
+    def __init__(self, base_url: str = "http://localhost:11434", benchmark_logger: BenchmarkLogger = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 client: Optional[DeepseekCoderClient] = None):
         self.base_url = base_url
         self.benchmark_logger = benchmark_logger
-        self.client = DeepseekCoderClient(base_url, benchmark_logger)
+        self._owns_client = client is None
+        self.client = client or DeepseekCoderClient(base_url, benchmark_logger, response_cache)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the client if this object created it"""
+        if self._owns_client:
+            self.client.close()
+
+
+class ModelComparator(ClientRunner):
+    """Compare performance across multiple models"""
 
     def compare_models(self, models: List[str], context: str, question: str,
-                      task_type: str = "general", timeout: int = 120) -> Dict[str, Any]:
-        """Compare responses and performance across multiple models"""
+                      task_type: str = "general", timeout: int = 120,
+                      warmup: bool = True) -> Dict[str, Any]:
+        """Compare responses and performance across multiple models
 
-        results = {}
+        With warmup, each model is loaded first so response times measure steady state.
+        """
 
-        for model in models:
-            print(f"🧪 Testing model: {model}")
+        return asyncio.run(self._acompare_models(models, context, question, task_type, timeout, warmup))
+
+    async def _acompare_models(self, models: List[str], context: str, question: str,
+                               task_type: str = "general", timeout: int = 120,
+                               warmup: bool = True) -> Dict[str, Any]:
+        """Query all models concurrently so their network waits overlap"""
 
-            result = self.client.chat_with_benchmark(
+        # The prompt is identical for every model, so build it once
+        full_prompt = self.client.get_specialized_prompt(task_type, context, question)
+
+        async def run_model(session: aiohttp.ClientSession, model: str) -> Dict[str, Any]:
+            result = await self.client._achat(
+                session,
                 prompt=question,
                 context=context,
                 model=model,
                 task_type=task_type,
-                timeout=timeout
+                timeout=timeout,
+                full_prompt=full_prompt
             )
 
-            results[model] = result
-
             print(f"✅ {model}: {result['response_time']:.2f}s")
 
-        return results
+            return result
+
+        async def warm_model(session: aiohttp.ClientSession, model: str):
+            result = await self.client._awarmup(session, model, timeout)
+            if result['success']:
+                print(f"🔥 {model} loaded in {result['response_time']:.2f}s")
+            else:
+                print(f"⚠️  {model} warm-up failed: {result['error']}")
+
+        async with self.client.async_session(timeout) as session:
+            if warmup:
+                # Models whose answer is already cached will not be queried
+                cold_models = [model for model in dict.fromkeys(models)
+                               if self.client._cached_response(model, full_prompt)[1] is None]
+                for model in cold_models:
+                    print(f"🔥 Warming up model: {model}")
+                await asyncio.gather(*(warm_model(session, model) for model in cold_models))
+
+            for model in models:
+                print(f"🧪 Testing model: {model}")
+
+            tasks = [run_model(session, model) for model in models]
+            results = await asyncio.gather(*tasks)
+
+        return dict(zip(models, results))
+
+
+class BatchRunner(ClientRunner):
+    """Run one question against many files concurrently"""
+
+    def run(self, files: List[str], question: str, model: str = "deepseek-coder",
+            task_type: str = "general", timeout: int = 120,
+            concurrency: int = 4) -> Dict[str, Any]:
+        """Ask the question about every file, at most `concurrency` requests at a time"""
+
+        return asyncio.run(self._arun(files, question, model, task_type, timeout, concurrency))
+
+    async def _arun(self, files: List[str], question: str, model: str = "deepseek-coder",
+                    task_type: str = "general", timeout: int = 120,
+                    concurrency: int = 4) -> Dict[str, Any]:
+        """Submit all files over one aiohttp session, gated by a semaphore"""
+
+        # Ollama only serves OLLAMA_NUM_PARALLEL requests at once; the rest would just queue
+        semaphore = asyncio.Semaphore(concurrency)
+
+        loop = asyncio.get_running_loop()
+
+        async def run_file(session: aiohttp.ClientSession, file_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                print(f"🧪 Processing: {file_path}")
+
+                # An unreadable file fails on its own instead of aborting the batch
+                try:
+                    context = await loop.run_in_executor(None, load_file_text, file_path)
+                except (OSError, ValueError) as e:
+                    error_message = f"Error reading file: {e}"
+                    result = self.client._finish_benchmark(model, task_type, "", "",
+                                                           f"Error: {error_message}", 0.0, None,
+                                                           False, error_message)
+                    print(f"❌ {file_path}: {error_message}")
+                    return result
+
+                result = await self.client._achat(
+                    session,
+                    prompt=question,
+                    context=context,
+                    model=model,
+                    task_type=task_type,
+                    timeout=timeout
+                )
+
+                print(f"✅ {file_path}: {result['response_time']:.2f}s")
+
+                return result
+
+        async with self.client.async_session(timeout) as session:
+            tasks = [run_file(session, file_path) for file_path in files]
+            results = await asyncio.gather(*tasks)
+
+        return dict(zip(files, results))
+
+
+# Successful model listings per base URL, as (fetched at, models)
+_models_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+
+def list_available_models(base_url: str = "http://localhost:11434",
+                          session: Optional[requests.Session] = None) -> List[str]:
+    """Get list of available Ollama models
 
+    Results are reused for MODELS_CACHE_TTL seconds so repeated calls skip the round trip.
+    """
+    cached = _models_cache.get(base_url)
+    if cached and time.monotonic() - cached[0] < MODELS_CACHE_TTL:
+        return list(cached[1])
 
-def list_available_models(base_url: str = "http://localhost:11434") -> List[str]:
-    """Get list of available Ollama models"""
+    http = session or requests
     try:
-        response = requests.get(f"{base_url}/api/tags", timeout=5)
+        response = http.get(f"{base_url}/api/tags", timeout=5)
         response.raise_for_status()
-        data = response.json()
-        return [model['name'] for model in data.get('models', [])]
+        data = orjson.loads(response.content)
+        models = [model['name'] for model in data.get('models', [])]
+        _models_cache[base_url] = (time.monotonic(), models)
+        return list(models)
     except Exception as e:
         print(f"Warning: Could not fetch model list: {e}")
         return ["deepseek-coder", "codellama", "llama2:7b-code"]
 
 
+def create_benchmark_logger(args: argparse.Namespace) -> Optional[BenchmarkLogger]:
+    """Create the benchmark logger requested on the command line, if any"""
+    if not args.benchmark:
+        return None
+    try:
+        return BenchmarkLogger(output_format=args.benchmark_format,
+                               compress_log=args.compress_log)
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+def create_response_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    """Create the response cache if --cache was given"""
+    return ResponseCache(args.cache_dir) if args.cache else None
+
+
+def run_batch(args: argparse.Namespace, question: Optional[str]):
+    """Batch mode: ask one question about every file matching args.batch"""
+    if question is None:
+        print("Error: --batch requires a question")
+        sys.exit(1)
+
+    files = sorted(path for path in glob.glob(args.batch, recursive=True) if Path(path).is_file())
+    if not files:
+        print(f"Error: No files match '{args.batch}'")
+        sys.exit(1)
+
+    # Initialize benchmark logger
+    benchmark_logger = create_benchmark_logger(args)
+
+    print(f"📚 Batch: {len(files)} files matching {args.batch}")
+    print(f"❓ Asking: {question}")
+    print(f"🤖 Using model: {args.model} ({args.task} task)")
+    print(f"🔀 Concurrency: {args.concurrency}")
+    print("\n" + "="*80 + "\n")
+
+    with BatchRunner(args.ollama_url, benchmark_logger, create_response_cache(args)) as runner:
+        results = runner.run(files, question, args.model, args.task, args.timeout, args.concurrency)
+
+    # Display results
+    print("\n📊 BATCH RESULTS:")
+    print("="*80)
+
+    for file_path, result in results.items():
+        print(f"\n📄 File: {file_path}")
+        print(f"⏱️  Response time: {result['response_time']:.2f}s")
+        print(f"✅ Success: {result['success']}")
+        print("="*40)
+        print(result['response'])
+        print("="*80)
+
+    # Close benchmark logger
+    if benchmark_logger:
+        benchmark_logger.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Chatty-CLI: Enhanced Deepseek-Coder with Performance Benchmarking',
@@ -312,6 +955,7 @@ Examples:
   %(prog)s test.py "Find bugs" --task debug
   %(prog)s main.py "Explain this code" --task explain --benchmark
   %(prog)s utils.py "Review for optimization" --task optimize --compare-model llama2:7b-code
+  %(prog)s "Review this file" --batch "src/**/*.py" --concurrency 4 --benchmark
 
 Task Types:
   review    - Code review with quality analysis
@@ -322,15 +966,15 @@ Task Types:
         """
     )
 
-    parser.add_argument('file', help='Python file to analyze')
-    parser.add_argument('question', help='Your question about the code')
+    parser.add_argument('file', nargs='?', help='Python file to analyze')
+    parser.add_argument('question', nargs='?', help='Your question about the code')
     parser.add_argument('--model', default='deepseek-coder',
                        help='Ollama model to use (default: deepseek-coder)')
     parser.add_argument('--compare-model',
                        help='Compare this model against the primary model')
     parser.add_argument('--models', nargs='+',
                        help='Compare multiple models (space-separated)')
-    parser.add_argument('--task', default='general', choices=['review', 'debug', 'explain', 'optimize', 'general'],
+    parser.add_argument('--task', default='general', choices=TASK_TYPES,
                        help='Task type for specialized prompting (default: general)')
     parser.add_argument('--ollama-url', default='http://localhost:11434',
                        help='Ollama API URL (default: http://localhost:11434)')
@@ -338,8 +982,20 @@ Task Types:
                        help='Request timeout in seconds (default: 120 for first run, increase if needed)')
     parser.add_argument('--benchmark', action='store_true',
                        help='Enable performance benchmarking')
+    parser.add_argument('--benchmark-format', default='csv', choices=['csv', 'parquet'],
+                       help='Benchmark output: CSV + JSON, or a single Parquet file (needs pyarrow) (default: csv)')
+    parser.add_argument('--compress-log', action='store_true',
+                       help='Write the JSON benchmark log zstd-compressed (needs zstandard)')
+    parser.add_argument('--cache', action='store_true',
+                       help='Reuse earlier responses for an identical Ollama URL, model and prompt instead of calling Ollama; entries never expire, delete --cache-dir to clear them')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Directory for cached responses (default: {DEFAULT_CACHE_DIR})')
     parser.add_argument('--list-models', action='store_true',
                        help='List available Ollama models and exit')
+    parser.add_argument('--batch', metavar='PATTERN',
+                       help='Ask the question about every file matching this glob (the question is the only positional argument; uses --model only)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='Maximum concurrent requests in batch mode; match OLLAMA_NUM_PARALLEL (default: 4)')
 
     args = parser.parse_args()
 
@@ -351,6 +1007,23 @@ Task Types:
             print(f"  - {model}")
         return
 
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+
+    if args.compress_log and args.benchmark_format == 'parquet':
+        parser.error('--compress-log only applies to --benchmark-format csv (Parquet output has no JSON log)')
+
+    if args.batch:
+        if args.question is not None:
+            parser.error('--batch takes the question as its only positional argument')
+        if args.models or args.compare_model:
+            parser.error('--batch queries only --model; it cannot be combined with --models or --compare-model')
+        run_batch(args, question=args.file)
+        return
+
+    if args.file is None or args.question is None:
+        parser.error('the following arguments are required: file, question')
+
     # Validate file exists
     if not Path(args.file).exists():
         print(f"Error: File '{args.file}' does not exist")
@@ -359,14 +1032,16 @@ Task Types:
     # Read file content
     print(f"📖 Reading file: {args.file}")
     file_content = read_file_content(args.file)
-    file_size = len(file_content.encode('utf-8'))
+    file_size = utf8_len(file_content)
     print(f"📊 File size: {file_size:,} bytes")
 
     # Initialize benchmark logger
-    benchmark_logger = BenchmarkLogger() if args.benchmark else None
+    benchmark_logger = create_benchmark_logger(args)
 
     # Initialize client
-    client = DeepseekCoderClient(base_url=args.ollama_url, benchmark_logger=benchmark_logger)
+    response_cache = create_response_cache(args)
+    client = DeepseekCoderClient(base_url=args.ollama_url, benchmark_logger=benchmark_logger,
+                                 response_cache=response_cache)
 
     print(f"❓ Asking: {args.question}")
     print(f"🤖 Using task type: {args.task}")
@@ -377,7 +1052,7 @@ Task Types:
         print("\n" + "="*80 + "\n")
 
         # Model comparison mode
-        comparator = ModelComparator(args.ollama_url, benchmark_logger)
+        comparator = ModelComparator(args.ollama_url, benchmark_logger, response_cache, client=client)
         results = comparator.compare_models(args.models, file_content, args.question, args.task, args.timeout)
 
         # Display results
@@ -398,7 +1073,7 @@ Task Types:
 
         # Two-model comparison
         models = [args.model, args.compare_model]
-        comparator = ModelComparator(args.ollama_url, benchmark_logger)
+        comparator = ModelComparator(args.ollama_url, benchmark_logger, response_cache, client=client)
         results = comparator.compare_models(models, file_content, args.question, args.task, args.timeout)
 
         # Display results
@@ -418,24 +1093,35 @@ Task Types:
         print(f"🤖 Using model: {args.model}")
         print("\n" + "="*80 + "\n")
 
+        def print_token(token: str):
+            print(token, end='', flush=True)
+
+        # Tokens are printed as they stream in
         result = client.chat_with_benchmark(
             prompt=args.question,
             context=file_content,
             model=args.model,
             task_type=args.task,
-            timeout=args.timeout
+            timeout=args.timeout,
+            on_token=print_token
         )
 
         if result['success']:
+            print("\n\n" + "="*40 + "\n")
             print(f"⏱️  Response time: {result['response_time']:.2f}s")
+            if result['time_to_first_token'] is not None:
+                print(f"⚡ Time to first token: {result['time_to_first_token']:.2f}s")
             print(f"✅ Model: {args.model} ({args.task} task)")
         else:
+            # A stream can fail midway; end the partial output before the error
+            if result['time_to_first_token'] is not None:
+                print()
             print(f"❌ Error: {result['error']}")
 
-        print("\n" + "="*40 + "\n")
-        print(result['response'])
         print("\n" + "="*80)
 
+    client.close()
+
     # Close benchmark logger
     if benchmark_logger:
         benchmark_logger.close()